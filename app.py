@@ -1,16 +1,104 @@
-from flask import Flask, request, jsonify
-from flasgger import Swagger, swag_from
-from test import load_data, preprocess_data, find_similar_content
-from sentence_transformers import SentenceTransformer
-import google.generativeai as genai
-from dotenv import load_dotenv
 import os
+from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+if __name__ == "__main__" and os.getenv("FLASK_DEV", "0") != "1":
+    # Serve with gunicorn (see gunicorn.conf.py) unless the dev server is asked for.
+    # Checked before anything heavy is imported or loaded, since gunicorn loads it all again.
+    os.execvp("gunicorn", ["gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"])
+
+# One BLAS/OpenMP thread per process, set before numpy and torch are imported.
+# Per-request work is tiny, and several gunicorn workers each sizing a pool to all
+# cores would oversubscribe the CPU. Setting these variables explicitly overrides this.
+for _var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+from flasgger import Swagger, swag_from
+from flask_compress import Compress
+from flask_cors import CORS
+from test import (
+    load_corpus, rank_chunks, unique_by_content, chunk_token_counts, fit_to_token_budget,
+    corpus_fingerprint, build_index, load_index, save_index, to_storage_dtype,
+    Float32Embeddings, build_faiss_index, search_faiss_index
+)
+from cache import LRUCache, SemanticCache
+from batcher import QueryBatcher
+from sentence_transformers import SentenceTransformer
+import google.generativeai as genai
+import numpy as np
+import orjson
+import hashlib
+import logging
+import threading
+import torch
+
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+torch.set_num_threads(int(os.environ["OMP_NUM_THREADS"]))
+try:
+    torch.set_num_interop_threads(1)
+except RuntimeError:
+    # Already set, or the inter-op pool was started by an earlier import
+    pass
+
 app = Flask(__name__)
 
+class ORJSONProvider(JSONProvider):
+    """
+    JSON provider backed by orjson; jsonify and request.json go through it.
+    """
+
+    @staticmethod
+    def _dumps_bytes(obj):
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=orjson.OPT_NON_STR_KEYS)
+
+    def dumps(self, obj, **kwargs):
+        return self._dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # jsonify: hand orjson's bytes to the response as is, skipping a decode/encode round trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumps_bytes(obj), mimetype="application/json")
+
+app.json = ORJSONProvider(app)
+
+# Static files (the Swagger UI assets) are served with ETag/Last-Modified for 304s;
+# also let browsers reuse them without revalidating for a while
+app.config["SEND_FILE_MAX_AGE_DEFAULT"] = int(os.getenv("STATIC_MAX_AGE", 2592000))
+
+# gzip/brotli-compress /chat answers, the API spec and the Swagger UI assets.
+# text/event-stream is left out: compressing it would buffer the stream until it ends.
+app.config["COMPRESS_MIMETYPES"] = [
+    "application/json", "text/html", "text/css", "text/javascript", "application/javascript"
+]
+app.config["COMPRESS_LEVEL"] = 5
+app.config["COMPRESS_BR_LEVEL"] = 5
+app.config["COMPRESS_MIN_SIZE"] = 500
+Compress(app)
+
+# Allow the portfolio frontend to call the API; browsers cache the /chat preflight for a day.
+# No origin is allowed unless CORS_ORIGINS lists it, except * on the development server.
+CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*" if os.getenv("FLASK_DEV", "0") == "1" else "")
+if CORS_ORIGINS:
+    CORS(
+        app,
+        origins=[origin.strip() for origin in CORS_ORIGINS.split(",")],
+        allow_headers=["Content-Type"],
+        methods=["GET", "POST", "OPTIONS"],
+        max_age=86400
+    )
+
 swagger_config = {
     "headers": [],
     "specs": [
@@ -26,143 +114,321 @@ swagger_config = {
     "specs_route": "/docs"
 }
 
-swagger = Swagger(app, config=swagger_config)
+# Specs live in specs/*.yml and are parsed once, then cached by Flasgger
+swagger = Swagger(app, config=swagger_config, template_file="specs/index.yml")
 
 # Get API key from environment variable
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     raise ValueError("GEMINI_API_KEY environment variable is not set")
     
-genai.configure(api_key=GEMINI_API_KEY)
+# The REST transport sends every call through one pooled keep-alive HTTP session per
+# process, so TLS setup is paid once per worker. The client is created on first use,
+# i.e. after gunicorn has forked, and unlike gRPC it has no fork-safety caveats.
+genai.configure(api_key=GEMINI_API_KEY, transport=os.getenv("GEMINI_TRANSPORT", "rest"))
+
+# Build the Gemini clients once instead of on every request
+GEMINI_FLASH = genai.GenerativeModel("gemini-1.5-flash")
+GEMINI_PRO = genai.GenerativeModel("gemini-pro")
+
+def warmup_gemini():
+    """
+    Send a one-token request so the Gemini channel is open before real traffic.
+    """
+    if os.getenv("GEMINI_WARMUP", "1") != "1":
+        return
+    try:
+        GEMINI_FLASH.generate_content("ping", generation_config={"max_output_tokens": 1})
+    except Exception as e:
+        logger.warning(f"Gemini warmup failed: {str(e)}")
+
+MODEL_NAME = os.getenv("EMBEDDING_MODEL", "paraphrase-MiniLM-L3-v2")
+# Directory produced by `python onnx_encoder.py`; when set, queries are encoded
+# with the int8 ONNX Runtime model instead of the PyTorch SentenceTransformer
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR")
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".embeddings")
+# bfloat16 runs the PyTorch model's matmuls at half width (AMX/AVX-512 BF16 on recent CPUs)
+MODEL_DTYPE = os.getenv("MODEL_DTYPE", "float32")
+if MODEL_DTYPE not in ("float32", "bfloat16"):
+    raise ValueError("MODEL_DTYPE must be float32 or bfloat16")
+# float16 halves the memory and bandwidth of the corpus matrix; scores are still float32
+EMBEDDING_DTYPE = os.getenv("EMBEDDING_DTYPE", "float32")
+if EMBEDDING_DTYPE not in ("float32", "float16", "int8"):
+    raise ValueError("EMBEDDING_DTYPE must be float32, float16 or int8")
+EMBEDDING_DTYPE = np.dtype(EMBEDDING_DTYPE)
+# "faiss" searches a FAISS IndexFlatIP (needs faiss-cpu); "numpy" scores CORPUS_EMB directly
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "numpy")
+if VECTOR_INDEX not in ("numpy", "faiss"):
+    raise ValueError("VECTOR_INDEX must be numpy or faiss")
+
+# Upper bound on retrieved context sent to Gemini; prompt prefill cost grows with it
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500))
+# Chunks retrieved per query, after dropping repeated contents
+RETRIEVAL_TOP_K = 5
 
 # Load and preprocess data once at startup
 json_file_path = "sreedata.json"
-data = load_data(json_file_path)
-text_chunks, original_data = preprocess_data(data)
+text_chunks, original_data = load_corpus(json_file_path)
+# Per-chunk token estimates, parallel to text_chunks, so requests never re-measure content
+CHUNK_TOKENS = chunk_token_counts(text_chunks)
 
 # Initialize model as None, will be loaded on first request
 model = None
+model_lock = threading.Lock()
 
 def get_model():
     global model
     if model is None:
-        model = SentenceTransformer('paraphrase-MiniLM-L3-v2')
+        # With PRELOAD_MODEL=0 the first requests race to load; only one of them should
+        with model_lock:
+            if model is None:
+                if ONNX_MODEL_DIR:
+                    from onnx_encoder import OnnxEncoder
+                    model = OnnxEncoder(ONNX_MODEL_DIR)
+                else:
+                    model = SentenceTransformer(MODEL_NAME, device="cpu")
+                    if MODEL_DTYPE == "bfloat16":
+                        model.to(torch.bfloat16)
+                        model.append(Float32Embeddings())
     return model
 
-@app.route("/chat", methods=["POST"])
-@swag_from({
-    "tags": ["Chat API"],
-    "summary": "Get response from Gemini based on portfolio data",
-    "parameters": [
-        {
-            "name": "body",
-            "in": "body",
-            "schema": {
-                "type": "object",
-                "required": ["query"],
-                "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "User query about the portfolio"
-                    }
-                }
-            }
-        }
-    ],
-    "responses": {
-        "200": {
-            "description": "Successful response",
-            "schema": {
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string"},
-                    "context_used": {"type": "array"},
-                    "gemini_response": {"type": "string"}
-                }
-            }
-        },
-        "400": {
-            "description": "Bad request",
-            "schema": {
-                "type": "object",
-                "properties": {
-                    "error": {"type": "string"}
-                }
-            }
-        },
-        "500": {
-            "description": "Server error",
-            "schema": {
-                "type": "object",
-                "properties": {
-                    "error": {"type": "string"}
-                }
-            }
-        }
+# Embed the corpus once at startup. The embeddings are cached on disk keyed by
+# the chunk contents and model name, so restarts skip loading the model for this.
+if ONNX_MODEL_DIR:
+    # Include the exported file's identity, so re-exporting another checkpoint into
+    # the same directory does not reuse the previous model's corpus embeddings
+    from onnx_encoder import QUANTIZED_MODEL_FILE
+    onnx_stat = os.stat(os.path.join(ONNX_MODEL_DIR, QUANTIZED_MODEL_FILE))
+    MODEL_ID = f"onnx:{ONNX_MODEL_DIR}:{onnx_stat.st_size}:{onnx_stat.st_mtime_ns}"
+elif MODEL_DTYPE != "float32":
+    MODEL_ID = f"{MODEL_NAME}:{MODEL_DTYPE}"
+else:
+    MODEL_ID = MODEL_NAME
+CORPUS_KEY = corpus_fingerprint(text_chunks, MODEL_ID)
+corpus_cache_path = os.path.join(EMBEDDING_CACHE_DIR, f"{CORPUS_KEY}.npy")
+CORPUS_EMB = load_index(corpus_cache_path)
+if CORPUS_EMB is None or CORPUS_EMB.shape[0] != len(text_chunks):
+    CORPUS_EMB = build_index(text_chunks, get_model())
+    save_index(corpus_cache_path, CORPUS_EMB)
+# FAISS keeps its own float32 copy, so EMBEDDING_DTYPE only applies to the NumPy path
+if VECTOR_INDEX == "faiss":
+    FAISS_INDEX = build_faiss_index(CORPUS_EMB)
+else:
+    FAISS_INDEX = None
+    CORPUS_EMB = to_storage_dtype(CORPUS_EMB, EMBEDDING_DTYPE)
+
+def rank_corpus(query_embedding, top_k=5):
+    """
+    Indices of the top_k corpus chunks for a normalized query, best first.
+    """
+    if FAISS_INDEX is not None:
+        return search_faiss_index(FAISS_INDEX, query_embedding, top_k)
+    return rank_chunks(CORPUS_EMB, query_embedding, top_k)
+
+# Load the model and run one encode at import time. Under gunicorn --preload this happens
+# before workers fork, so they inherit the loaded weights and initialized kernels
+# (shared copy-on-write) instead of each loading them on their first request.
+if os.getenv("PRELOAD_MODEL", "1") == "1":
+    get_model().encode(["warmup"], convert_to_numpy=True)
+
+# Concurrent requests share one batched encode call instead of encoding one by one
+QUERY_BATCHER = QueryBatcher(get_model, max_wait=float(os.getenv("ENCODE_BATCH_WAIT_MS", 5)) / 1000)
+
+def warmup_worker():
+    """
+    Warm per-process state on a background thread: start the query batcher and open
+    the Gemini connection. Called once per worker after forking (see gunicorn.conf.py),
+    so the worker starts serving right away and the first request finds both ready.
+    """
+    def warm():
+        try:
+            QUERY_BATCHER.encode("warmup")
+        except Exception as e:
+            logger.warning(f"Encoder warmup failed: {str(e)}")
+        warmup_gemini()
+
+    threading.Thread(target=warm, daemon=True).start()
+
+def normalize_query(query):
+    # Lowercase and collapse whitespace so trivially different spellings share cache entries
+    return " ".join(query.lower().split())
+
+# Query embeddings keyed by normalized text, so repeated queries skip the model
+QUERY_EMBEDDINGS = LRUCache(max_size=4096)
+
+def encode_query_cached(query):
+    key = normalize_query(query)
+    embedding = QUERY_EMBEDDINGS.get(key)
+    if embedding is None:
+        embedding = QUERY_BATCHER.encode(query)
+        QUERY_EMBEDDINGS.set(key, embedding)
+    return embedding
+
+# Retrieved chunk indices keyed by corpus and (float16-rounded) query embedding. Survives
+# response-cache misses, e.g. when the prompt or the Gemini call changes. Keys include
+# CORPUS_KEY, so a reloaded corpus never sees stale results.
+RETRIEVAL_CACHE = LRUCache(max_size=2048)
+
+def retrieval_cache_key(query_embedding):
+    digest = hashlib.blake2b(query_embedding.astype(np.float16).tobytes(), digest_size=16).digest()
+    return CORPUS_KEY, digest
+
+# Two-tier response cache: exact (normalized) query text first, then query embedding
+# so paraphrased questions also skip retrieval and Gemini
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 3600))
+EXACT_CACHE = LRUCache(max_size=2048, ttl=RESPONSE_CACHE_TTL)
+SEMANTIC_CACHE = SemanticCache(
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95)),
+    max_size=int(os.getenv("SEMANTIC_CACHE_SIZE", 1024)),
+    ttl=RESPONSE_CACHE_TTL
+)
+
+def query_cache_key(query):
+    return hashlib.blake2b(normalize_query(query).encode("utf-8"), digest_size=16).digest()
+
+# Fixed parts of the Gemini prompt; only the context and query vary per request
+PROMPT_PREFIX = "Context:\n"
+PROMPT_MID = "\n\nUser Query: "
+PROMPT_SUFFIX = "\nAnswer based on the context above."
+
+def build_prompt(context_text, user_query):
+    return "".join((PROMPT_PREFIX, context_text, PROMPT_MID, user_query, PROMPT_SUFFIX))
+
+def generate_answer(prompt, stream=False):
+    # Call Gemini with a valid model name
+    try:
+        return GEMINI_FLASH.generate_content(prompt, stream=stream)
+    except Exception as model_error:
+        # Fallback to gemini-pro if the flash model is not available
+        logger.warning(f"Error with gemini-1.5-flash: {model_error}. Falling back to gemini-pro.")
+        return GEMINI_PRO.generate_content(prompt, stream=stream)
+
+def remember_answer(cache_key, query_embedding, result):
+    EXACT_CACHE.set(cache_key, result)
+    SEMANTIC_CACHE.add(query_embedding, result)
+
+def sse_event(data, event=None):
+    payload = orjson.dumps(data).decode()
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+def stream_answer(response, result, cache_key, query_embedding):
+    """
+    Yield Gemini output as server-sent `data` events as it is generated, then a
+    `done` event with the rest of the response. The full answer is cached at the end.
+    """
+    parts = []
+    try:
+        for chunk in response:
+            parts.append(chunk.text)
+            yield sse_event({"token": chunk.text})
+    except Exception as e:
+        logger.error(f"Error while streaming Gemini response: {str(e)}")
+        yield sse_event({"error": str(e)}, event="error")
+        return
+
+    result["gemini_response"] = "".join(parts)
+    remember_answer(cache_key, query_embedding, result)
+    yield sse_event({key: value for key, value in result.items() if key != "gemini_response"}, event="done")
+
+def stream_cached_answer(result):
+    yield sse_event({"token": result["gemini_response"]})
+    yield sse_event({key: value for key, value in result.items() if key != "gemini_response"}, event="done")
+
+def event_stream_response(events):
+    # Tell proxies not to buffer, otherwise tokens arrive all at once
+    return Response(events, mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def answer_query(user_query, stream):
+    # Repeated questions are answered without encoding the query at all
+    cache_key = query_cache_key(user_query)
+    cached_response = EXACT_CACHE.get(cache_key)
+
+    if cached_response is None:
+        query_embedding = encode_query_cached(user_query)
+
+        # Reuse the answer to a near-identical earlier question. It is not copied into
+        # EXACT_CACHE, which would restart its TTL and keep a stale answer alive.
+        cached_response = SEMANTIC_CACHE.get(query_embedding)
+
+    if cached_response is not None:
+        result = {**cached_response, "query": user_query}
+        return event_stream_response(stream_cached_answer(result)) if stream else jsonify(result)
+
+    # Find similar content
+    retrieval_key = retrieval_cache_key(query_embedding)
+    top_indices = RETRIEVAL_CACHE.get(retrieval_key)
+    if top_indices is None:
+        # Rank extra candidates so chunks dropped as duplicates are replaced by the next best
+        ranked = rank_corpus(query_embedding, 2 * RETRIEVAL_TOP_K).tolist()
+        top_indices = unique_by_content(ranked, text_chunks)[:RETRIEVAL_TOP_K]
+        RETRIEVAL_CACHE.set(retrieval_key, top_indices)
+
+    # Prepare context for Gemini, dropping the lowest-ranked chunks over budget
+    top_indices, context_dropped = fit_to_token_budget(top_indices, CHUNK_TOKENS, CONTEXT_TOKEN_BUDGET)
+    similar_content = [text_chunks[i] for i in top_indices]
+    context_text = "\n".join(
+        [str(item["content"]) for item in similar_content]
+    )
+    prompt = build_prompt(context_text, user_query)
+
+    result = {
+        "query": user_query,
+        "context_used": similar_content,
+        "context_dropped": context_dropped
     }
-})
-def chat():
+    response = generate_answer(prompt, stream=stream)
+    if stream:
+        return event_stream_response(stream_answer(response, result, cache_key, query_embedding))
+
+    result["gemini_response"] = response.text
+    remember_answer(cache_key, query_embedding, result)
+    return jsonify(result)
+
+def handle_chat(stream):
     try:
         user_query = request.json.get("query", "")
 
         if not user_query:
             return jsonify({"error": "Query is required"}), 400
 
-        # Find similar content
-        current_model = get_model()
-        similar_content = find_similar_content(user_query, text_chunks, original_data, current_model)
-
-        # Prepare context for Gemini
-        context_text = "\n".join(
-            [str(item["content"]) for item in similar_content]
-        )
-        prompt = f"Context:\n{context_text}\n\nUser Query: {user_query}\nAnswer based on the context above."
-
-        # Call Gemini with a valid model name
-        try:
-            response = genai.GenerativeModel("gemini-1.5-flash").generate_content(prompt)
-        except Exception as model_error:
-            # Fallback to gemini-pro if the flash model is not available
-            print(f"Error with gemini-1.5-flash: {model_error}. Falling back to gemini-pro.")
-            response = genai.GenerativeModel("gemini-pro").generate_content(prompt)
-
-        return jsonify({
-            "query": user_query,
-            "context_used": similar_content,
-            "gemini_response": response.text
-        })
+        return answer_query(user_query, stream)
 
     except Exception as e:
-        print(f"Error in chat endpoint: {str(e)}")
+        logger.error(f"Error in chat endpoint: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-@app.route("/", methods=["GET"])
-@swag_from({
-    "tags": ["Home"],
-    "summary": "API home endpoint",
-    "responses": {
-        "200": {
-            "description": "Welcome message",
-            "schema": {
-                "type": "object",
-                "properties": {
-                    "message": {"type": "string"},
-                    "status": {"type": "string"}
-                }
-            }
-        }
-    }
+@app.route("/chat", methods=["POST"])
+@swag_from("specs/chat.yml")
+def chat():
+    # Clients that prefer text/event-stream get the streaming response here too
+    best = request.accept_mimetypes.best_match(["application/json", "text/event-stream"])
+    return handle_chat(stream=(best == "text/event-stream"))
+
+@app.route("/chat/stream", methods=["POST"])
+@swag_from("specs/chat_stream.yml")
+def chat_stream():
+    return handle_chat(stream=True)
+
+# The status payload never changes, so serialize it once instead of per health check
+HOME_RESPONSE = orjson.dumps({
+    "message": "Portfolio AI Chat API is running",
+    "status": "online"
 })
+
+@app.route("/", methods=["GET"])
+@swag_from("specs/home.yml")
 def home():
-    return jsonify({
-        "message": "Portfolio AI Chat API is running",
-        "status": "online"
-    })
+    return Response(HOME_RESPONSE, mimetype="application/json")
 
 if __name__ == "__main__":
     # Get port and host from environment variables or use defaults
-    port = int(os.getenv("PORT", 5000))
+    port = int(os.getenv("PORT", 10000))
     host = os.getenv("HOST", "0.0.0.0")
     
-    # Run the app
+    warmup_worker()
+    
+    # Run Werkzeug's development server
     app.run(host=host, port=port, debug=(os.getenv("FLASK_DEBUG", "0") == "1"))
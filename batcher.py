@@ -0,0 +1,67 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+import numpy as np
+
+class QueryBatcher:
+    """
+    Coalesces concurrent query encodes into a single batched model.encode call.
+    Queries that arrive within `max_wait` seconds of the first one in a batch
+    are encoded together, up to `max_batch_size` at a time.
+    """
+
+    def __init__(self, get_model: Callable, max_batch_size: int = 32, max_wait: float = 0.005):
+        self._get_model = get_model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = None
+        self._worker_pid = None
+        self._lock = threading.Lock()
+
+    def encode(self, query: str) -> np.ndarray:
+        """
+        Encode one query into a unit-length float32 vector, blocking until its batch is done.
+        """
+        future = Future()
+        self._ensure_worker().put((query, future))
+        return future.result()
+
+    def _ensure_worker(self) -> queue.Queue:
+        # Threads do not survive fork, so each process (e.g. gunicorn worker) starts its own
+        pid = os.getpid()
+        if self._worker_pid != pid:
+            with self._lock:
+                if self._worker_pid != pid:
+                    self._queue = queue.Queue()
+                    threading.Thread(target=self._run, args=(self._queue,), daemon=True).start()
+                    self._worker_pid = pid
+        return self._queue
+
+    def _run(self, pending: queue.Queue) -> None:
+        while True:
+            items = [pending.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(items) < self.max_batch_size:
+                try:
+                    items.append(pending.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+
+            try:
+                embeddings = self._get_model().encode(
+                    [query for query, _ in items],
+                    batch_size=len(items),
+                    convert_to_numpy=True,
+                    normalize_embeddings=True
+                )
+                embeddings = np.asarray(embeddings, dtype=np.float32)
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), embedding in zip(items, embeddings):
+                future.set_result(embedding)
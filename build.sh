@@ -11,6 +11,17 @@ pip install setuptools==68.2.2 wheel==0.41.2
 # Install dependencies with specific versions
 pip install -r requirements.txt
 
+# Export the int8 ONNX encoder at build time so it ships with the deploy
+if [ -n "$ONNX_MODEL_DIR" ] && [ ! -f "$ONNX_MODEL_DIR/model.int8.onnx" ]; then
+    model="${EMBEDDING_MODEL:-paraphrase-MiniLM-L3-v2}"
+    case "$model" in
+        */*) ;;
+        *) model="sentence-transformers/$model" ;;
+    esac
+    pip install onnxruntime "optimum[onnxruntime]"
+    python onnx_encoder.py "$model" "$ONNX_MODEL_DIR"
+fi
+
 # Print versions for debugging
 echo "Python version:"
 python --version
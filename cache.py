@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+import numpy as np
+
+class LRUCache:
+    """
+    Thread-safe exact-match cache that evicts the least recently used key.
+    With `ttl` (seconds), entries also expire that long after being set.
+    """
+
+    def __init__(self, max_size: int = 2048, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            if len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+class SemanticCache:
+    """
+    Response cache looked up by embedding similarity, so paraphrases of an
+    earlier query hit as well. Embeddings must be unit length.
+    The least recently used entry is evicted once max_size is reached.
+    With `ttl` (seconds), entries also stop matching that long after being added.
+
+    Small caches are scanned exactly. From `lsh_min_size` entries on, lookups
+    only rescore candidates from a random-projection LSH index: `num_tables`
+    tables of `bits_per_table` sign bits, probing each query bucket and its
+    Hamming-distance-1 neighbours. A cache whose max_size is below lsh_min_size
+    never builds the index.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_size: int = 1024, num_tables: int = 8,
+                 bits_per_table: int = 16, lsh_min_size: int = 2048, seed: int = 0,
+                 ttl: Optional[float] = None):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_size = max_size
+        self.num_tables = num_tables
+        self.bits_per_table = bits_per_table
+        self.lsh_min_size = lsh_min_size
+        self._use_lsh = max_size >= lsh_min_size
+        self._rng = np.random.default_rng(seed)
+        self._embeddings = None  # (max_size, dim) float32, allocated on first add
+        self._planes = None  # (num_tables * bits_per_table, dim) random hyperplanes
+        self._values = []
+        self._last_used = np.zeros(max_size, dtype=np.int64)
+        self._expires_at = np.full(max_size, np.inf)
+        self._slot_keys = np.zeros((max_size, num_tables), dtype=np.int64)
+        self._buckets = [{} for _ in range(num_tables)]
+        self._bit_weights = 1 << np.arange(bits_per_table, dtype=np.int64)
+        self._clock = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def _hash(self, embedding: np.ndarray) -> np.ndarray:
+        bits = (self._planes @ embedding > 0).reshape(self.num_tables, self.bits_per_table)
+        return bits @ self._bit_weights
+
+    def _candidates(self, keys: np.ndarray) -> np.ndarray:
+        slots = set()
+        for table, key in zip(self._buckets, keys.tolist()):
+            slots.update(table.get(key, ()))
+            for bit in range(self.bits_per_table):
+                slots.update(table.get(key ^ (1 << bit), ()))
+        return np.fromiter(slots, dtype=np.int64, count=len(slots))
+
+    def get(self, embedding: np.ndarray) -> Optional[Any]:
+        """
+        Return the value stored for the most similar embedding, or None if
+        nothing is at least `threshold` cosine-similar.
+        """
+        with self._lock:
+            size = len(self._values)
+            if size == 0:
+                return None
+
+            if size < self.lsh_min_size:
+                slots = slice(0, size)
+            else:
+                slots = self._candidates(self._hash(embedding))
+                if len(slots) == 0:
+                    return None
+            similarities = self._embeddings[slots] @ embedding
+            if self.ttl is not None:
+                # Expired entries never match, even on an identical query
+                similarities[self._expires_at[slots] < time.monotonic()] = -np.inf
+            position = int(np.argmax(similarities))
+            best = position if isinstance(slots, slice) else int(slots[position])
+            best_similarity = similarities[position]
+
+            if best_similarity < self.threshold:
+                return None
+
+            self._clock += 1
+            self._last_used[best] = self._clock
+            return self._values[best]
+
+    def add(self, embedding: np.ndarray, value: Any) -> None:
+        """
+        Store a value under its query embedding.
+        """
+        with self._lock:
+            if self._embeddings is None:
+                dim = embedding.shape[0]
+                self._embeddings = np.zeros((self.max_size, dim), dtype=np.float32)
+                if self._use_lsh:
+                    self._planes = self._rng.standard_normal(
+                        (self.num_tables * self.bits_per_table, dim)
+                    ).astype(np.float32)
+
+            if len(self._values) < self.max_size:
+                slot = len(self._values)
+                self._values.append(value)
+            else:
+                slot = int(np.argmin(self._last_used))
+                self._values[slot] = value
+                if self._use_lsh:
+                    for table, key in zip(self._buckets, self._slot_keys[slot].tolist()):
+                        table[key].discard(slot)
+
+            if self._use_lsh:
+                keys = self._hash(embedding)
+                for table, key in zip(self._buckets, keys.tolist()):
+                    table.setdefault(key, set()).add(slot)
+                self._slot_keys[slot] = keys
+
+            self._embeddings[slot] = embedding
+            if self.ttl is not None:
+                self._expires_at[slot] = time.monotonic() + self.ttl
+            self._clock += 1
+            self._last_used[slot] = self._clock
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values = []
+            self._last_used[:] = 0
+            self._buckets = [{} for _ in range(self.num_tables)]
@@ -0,0 +1,23 @@
+import os
+from dotenv import load_dotenv
+
+# Read PORT etc. from .env, as app.py does
+load_dotenv()
+
+# Picked up automatically by `gunicorn wsgi:app` (Procfile / render.yaml)
+bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"
+
+# Import the app once in the master and fork workers from it, so the embedding
+# model and corpus embeddings are shared between workers copy-on-write
+preload_app = True
+
+# Threaded workers keep serving other requests while one waits on Gemini
+worker_class = "gthread"
+# Defaults to one per CPU; render.yaml sets WEB_CONCURRENCY to fit the 512M memory limit
+workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+
+def post_worker_init(worker):
+    # Threads and network connections do not survive fork, so warm them in each worker
+    from app import warmup_worker
+    warmup_worker()
@@ -0,0 +1,88 @@
+import os
+import sys
+from typing import List, Union
+import numpy as np
+
+QUANTIZED_MODEL_FILE = "model.int8.onnx"
+
+class OnnxEncoder:
+    """
+    Sentence encoder backed by an int8-quantized ONNX Runtime model.
+    Mirrors the parts of SentenceTransformer.encode that the app relies on.
+    """
+
+    def __init__(self, model_dir: str, max_seq_length: int = 128):
+        # Imported here so the default SentenceTransformer setup does not need onnxruntime
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, QUANTIZED_MODEL_FILE),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_seq_length = max_seq_length
+
+    def _encode_batch(self, sentences: List[str], normalize_embeddings: bool) -> np.ndarray:
+        features = self.tokenizer(
+            sentences,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np"
+        )
+        inputs = {name: value.astype(np.int64) for name, value in features.items() if name in self.input_names}
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        # Mean pooling over real tokens, same as the SentenceTransformer Pooling module
+        mask = features["attention_mask"][..., None].astype(np.float32)
+        embeddings = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+        if normalize_embeddings:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings.astype(np.float32)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        """
+        Encode one sentence or a list of sentences into float32 embeddings.
+        """
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        batches = [
+            self._encode_batch(sentences[start:start + batch_size], normalize_embeddings)
+            for start in range(0, len(sentences), batch_size)
+        ]
+        embeddings = np.concatenate(batches) if batches else np.zeros((0, 0), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+def export_quantized_model(model_name: str, output_dir: str) -> str:
+    """
+    Export a SentenceTransformer checkpoint to ONNX and quantize its weights to int8.
+    """
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    from transformers import AutoTokenizer
+
+    ORTModelForFeatureExtraction.from_pretrained(model_name, export=True).save_pretrained(output_dir)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(output_dir)
+
+    quantized_path = os.path.join(output_dir, QUANTIZED_MODEL_FILE)
+    quantize_dynamic(
+        os.path.join(output_dir, "model.onnx"),
+        quantized_path,
+        weight_type=QuantType.QInt8
+    )
+    return quantized_path
+
+if __name__ == "__main__":
+    # Usage: python onnx_encoder.py [model_name] [output_dir]
+    model_name = sys.argv[1] if len(sys.argv) > 1 else "sentence-transformers/paraphrase-MiniLM-L3-v2"
+    output_dir = sys.argv[2] if len(sys.argv) > 2 else "onnx_model"
+    print(f"Saved quantized model to {export_quantized_model(model_name, output_dir)}")
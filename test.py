@@ -1,9 +1,22 @@
 import json
 import os
-from typing import List, Dict, Tuple, Any
+import hashlib
+import functools
+import logging
+from typing import List, Dict, Tuple, Any, Optional, Callable
 import numpy as np
+import orjson
+import torch
 from sentence_transformers import SentenceTransformer, util
 
+logger = logging.getLogger(__name__)
+
+try:
+    # Optional SIMD dot-product kernels; NumPy has no BLAS path for float16 or int8
+    import simsimd
+except ImportError:
+    simsimd = None
+
 def load_data(file_path: str) -> Dict:
     """
     Load data from a JSON file.
@@ -13,117 +26,334 @@ def load_data(file_path: str) -> Dict:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
         
-        # Try to open and parse the JSON
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Read the file in one call and parse the bytes with orjson
+        with open(file_path, 'rb') as f:
+            data = orjson.loads(f.read())
         return data
     except json.JSONDecodeError:
-        print(f"Error: Invalid JSON in {file_path}")
+        logger.error(f"Error: Invalid JSON in {file_path}")
         return {}
     except Exception as e:
-        print(f"Error loading data: {str(e)}")
+        logger.error(f"Error loading data: {str(e)}")
         return {}
 
+def render_personal_info(info: Dict) -> str:
+    contact = info.get('contact') or {}
+    return "\n".join([
+        f"Name: {info.get('name', '')}",
+        f"Title: {info.get('title', '')}",
+        f"Technologies: {', '.join(info.get('technologies') or ())}",
+        f"Contact: {contact.get('email', '')}, {contact.get('phone', '')}, {contact.get('location', '')}",
+    ])
+
+def render_job(job: Dict) -> str:
+    return "\n".join([
+        f"Role: {job.get('role', '')}",
+        f"Company: {job.get('company', '')}",
+        f"Years: {job.get('years', '')}",
+        f"Location: {job.get('location', '')}",
+        f"Achievements: {', '.join(job.get('achievements') or ())}",
+        f"Technologies: {', '.join(job.get('technologies') or ())}",
+    ])
+
+def render_education(edu: Dict) -> str:
+    return "\n".join([
+        f"Degree: {edu.get('degree', '') or edu.get('qualification', '')}",
+        f"Field: {edu.get('field', '')}",
+        f"Institution: {edu.get('institution', '')}",
+        f"Years: {edu.get('years', '')}",
+        f"Grade: {edu.get('grade', '')}",
+        f"Achievements: {', '.join(edu.get('achievements') or ())}",
+    ])
+
+def render_project(project: Dict) -> str:
+    return "\n".join([
+        f"Project: {project.get('name', '')}",
+        f"Category: {project.get('category', '')}",
+        f"Description: {project.get('description', '')}",
+        f"Duration: {project.get('duration', '')}",
+        f"Team Size: {project.get('teamSize', '')}",
+        f"Technologies: {', '.join(project.get('technologies') or ())}",
+        f"Features: {', '.join(project.get('features') or ())}",
+    ])
+
+def render_hackathon(event: Dict) -> str:
+    return "\n".join([
+        f"Hackathon: {event.get('event', '')}",
+        f"Result: {event.get('result', '')}",
+        f"Month/Year: {event.get('monthYear', '')}",
+        f"Host: {event.get('host', '')}",
+        f"Team Size: {event.get('teamSize', '')}",
+        f"Technologies: {', '.join(event.get('technologies') or ())}",
+        f"Awards: {', '.join(event.get('awards') or ())}",
+    ])
+
+def render_skills(group: Dict) -> str:
+    # Every line, including the last, ends in a newline
+    lines = [f"Skill Category: {group['category']}"]
+    lines.extend(f"{skill}: {proficiency}" for skill, proficiency in group['skills'].items())
+    return "\n".join(lines) + "\n"
+
+# Chunk type -> (items in the portfolio data, metadata key copied onto each chunk, renderer)
+SECTIONS: Dict[str, Tuple[Callable[[Dict], List[Dict]], Optional[str], Callable[[Dict], str]]] = {
+    "personal_info": (lambda data: [data], None, render_personal_info),
+    "work_experience": (lambda data: data.get('workExperience', []), "company", render_job),
+    "education": (lambda data: data.get('education', []), "institution", render_education),
+    "project": (lambda data: data.get('projects', []), "name", render_project),
+    "hackathon": (lambda data: data.get('hackathons', {}).get('events', []), "event", render_hackathon),
+    "skills": (
+        lambda data: [{"category": category, "skills": skills} for category, skills in data.get('skills', {}).items()],
+        "category",
+        render_skills
+    ),
+}
+
 def preprocess_data(data: Dict) -> Tuple[List[Dict], Dict]:
     """
-    Process the JSON data into text chunks for embedding.
+    Process the JSON data into text chunks for embedding, one per item of each section in SECTIONS.
     """
     text_chunks = []
+    for chunk_type, (get_items, key, render) in SECTIONS.items():
+        for item in get_items(data):
+            chunk = {"content": render(item), "type": chunk_type}
+            if key is not None:
+                chunk[key] = item.get(key, '')
+            text_chunks.append(chunk)
     
-    # Process personal info
-    text_chunks.append({
-        "content": f"Name: {data.get('name', '')}\nTitle: {data.get('title', '')}\n" +
-                  f"Technologies: {', '.join(data.get('technologies', []))}\n" +
-                  f"Contact: {data.get('contact', {}).get('email', '')}, {data.get('contact', {}).get('phone', '')}, {data.get('contact', {}).get('location', '')}",
-        "type": "personal_info"
-    })
-    
-    # Process work experience
-    for job in data.get('workExperience', []):
-        text_chunks.append({
-            "content": f"Role: {job.get('role', '')}\nCompany: {job.get('company', '')}\n" +
-                      f"Years: {job.get('years', '')}\nLocation: {job.get('location', '')}\n" +
-                      f"Achievements: {', '.join(job.get('achievements', []))}\n" +
-                      f"Technologies: {', '.join(job.get('technologies', []))}",
-            "type": "work_experience",
-            "company": job.get('company', '')
-        })
-    
-    # Process education
-    for edu in data.get('education', []):
-        text_chunks.append({
-            "content": f"Degree: {edu.get('degree', '') or edu.get('qualification', '')}\n" +
-                      f"Field: {edu.get('field', '')}\nInstitution: {edu.get('institution', '')}\n" +
-                      f"Years: {edu.get('years', '')}\nGrade: {edu.get('grade', '')}\n" +
-                      f"Achievements: {', '.join(edu.get('achievements', []))}",
-            "type": "education",
-            "institution": edu.get('institution', '')
-        })
+    return text_chunks, data
+
+@functools.lru_cache(maxsize=4)
+def _load_corpus(file_path: str, mtime_ns: Optional[int]) -> Tuple[List[Dict], Dict]:
+    return preprocess_data(load_data(file_path))
+
+def load_corpus(file_path: str) -> Tuple[List[Dict], Dict]:
+    """
+    Load and preprocess a data file, reusing the result until the file's mtime changes.
+    The returned chunks and data are shared between callers and must not be modified.
+    """
+    try:
+        mtime_ns = os.stat(file_path).st_mtime_ns
+    except OSError:
+        mtime_ns = None  # load_data reports the missing file
+    return _load_corpus(file_path, mtime_ns)
+
+def corpus_fingerprint(text_chunks: List[Dict], model_name: str) -> str:
+    """
+    Hash the chunk contents together with the model name.
+    """
+    digest = hashlib.sha256(model_name.encode('utf-8'))
+    for chunk in text_chunks:
+        digest.update(b'\0')
+        digest.update(str(chunk["content"]).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+class Float32Embeddings(torch.nn.Module):
+    """
+    Final SentenceTransformer module that casts sentence embeddings back to float32,
+    so a model run in bfloat16 still returns arrays NumPy can hold.
+    """
+
+    def forward(self, features: Dict) -> Dict:
+        features["sentence_embedding"] = features["sentence_embedding"].float()
+        return features
+
+def build_index(text_chunks: List[Dict], model) -> np.ndarray:
+    """
+    Encode all text chunks once so requests only need to encode the query.
+    Rows are unit length, so a dot product with a normalized query is the cosine.
+    """
+    # Encode each distinct content once, shortest first so each batch pads to similar
+    # lengths, then scatter the rows back to chunk order
+    contents = np.array([chunk["content"] for chunk in text_chunks], dtype=object)
+    unique_contents, inverse = np.unique(contents, return_inverse=True)
+    order = np.argsort([len(content) for content in unique_contents], kind="stable")
+    sorted_embeddings = model.encode(
+        [unique_contents[i] for i in order],
+        batch_size=64,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False
+    )
+    unique_embeddings = np.empty((len(unique_contents), sorted_embeddings.shape[1]), dtype=np.float32)
+    unique_embeddings[order] = sorted_embeddings
+    embeddings = unique_embeddings[inverse.ravel()]
+    assert np.allclose(np.linalg.norm(embeddings, axis=1), 1.0, atol=1e-3), "chunk embeddings are not unit length"
+    return embeddings
+
+def load_index(cache_path: str) -> Optional[np.ndarray]:
+    """
+    Load previously saved chunk embeddings, or None if there is no usable cache.
+    A float32 cache is memory-mapped read-only, so every worker process reads the
+    same page-cache pages instead of holding its own copy.
+    """
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        embeddings = np.asarray(np.load(cache_path, mmap_mode='r'))
+        if embeddings.dtype != np.float32:
+            embeddings = embeddings.astype(np.float32)
+    except Exception as e:
+        logger.warning(f"Error loading embeddings cache: {str(e)}")
+        return None
     
-    # Process projects
-    for project in data.get('projects', []):
-        text_chunks.append({
-            "content": f"Project: {project.get('name', '')}\nCategory: {project.get('category', '')}\n" +
-                      f"Description: {project.get('description', '')}\n" +
-                      f"Duration: {project.get('duration', '')}\nTeam Size: {project.get('teamSize', '')}\n" +
-                      f"Technologies: {', '.join(project.get('technologies', []))}\n" +
-                      f"Features: {', '.join(project.get('features', []))}",
-            "type": "project",
-            "name": project.get('name', '')
-        })
+    # Scoring assumes unit-length rows, so normalize a cache written without them
+    # (into a new array, since the mapping is read-only)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    if not np.allclose(norms, 1.0, atol=1e-3):
+        embeddings = embeddings / np.maximum(norms, 1e-12)
+    return embeddings
+
+def save_index(cache_path: str, chunk_embeddings: np.ndarray) -> None:
+    """
+    Persist chunk embeddings so restarts can skip encoding the corpus.
+    """
+    try:
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+        np.save(cache_path, chunk_embeddings)
+    except Exception as e:
+        logger.warning(f"Error saving embeddings cache: {str(e)}")
+
+def encode_query(query: str, model) -> np.ndarray:
+    """
+    Encode a query into a unit-length float32 vector.
+    """
+    embedding = model.encode(query, convert_to_numpy=True, normalize_embeddings=True)
+    return np.asarray(embedding, dtype=np.float32)
+
+# Rows per block when upcasting a reduced-precision chunk matrix for scoring
+SCORE_BLOCK_ROWS = 4096
+
+# Unit-length components lie in [-1, 1], so one fixed scale maps them onto int8
+INT8_SCALE = 127.0
+
+def to_storage_dtype(chunk_embeddings: np.ndarray, dtype) -> np.ndarray:
+    """
+    Convert float32 chunk embeddings to the in-memory dtype: float32, float16, or int8
+    (each component rounded to a multiple of 1/127).
+    """
+    if np.dtype(dtype) == np.int8:
+        return np.round(chunk_embeddings * INT8_SCALE).astype(np.int8)
+    return chunk_embeddings.astype(dtype, copy=False)
+
+def score_chunks(chunk_embeddings: np.ndarray, query_embedding: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarity of every chunk with the query (both sides unit length).
+    float16 and int8 matrices are scored natively by simsimd when it is installed, and
+    otherwise upcast a block at a time, so a full float32 copy is never built.
+    """
+    if chunk_embeddings.dtype == np.float32:
+        return chunk_embeddings @ query_embedding
     
-    # Process hackathons
-    for event in data.get('hackathons', {}).get('events', []):
-        text_chunks.append({
-            "content": f"Hackathon: {event.get('event', '')}\nResult: {event.get('result', '')}\n" +
-                      f"Month/Year: {event.get('monthYear', '')}\nHost: {event.get('host', '')}\n" +
-                      f"Team Size: {event.get('teamSize', '')}\n" +
-                      f"Technologies: {', '.join(event.get('technologies', []))}\n" +
-                      f"Awards: {', '.join(event.get('awards', []))}",
-            "type": "hackathon",
-            "event": event.get('event', '')
-        })
+    if simsimd is not None:
+        if chunk_embeddings.dtype == np.int8:
+            query, scale = np.round(query_embedding * INT8_SCALE).astype(np.int8), 1.0 / INT8_SCALE ** 2
+        else:
+            query, scale = query_embedding.astype(chunk_embeddings.dtype), 1.0
+        scores = np.asarray(simsimd.cdist(query[None, :], chunk_embeddings, metric="dot"), dtype=np.float32)
+        return scores.ravel() * np.float32(scale)
     
-    # Process skills
-    for category, skills in data.get('skills', {}).items():
-        skill_text = f"Skill Category: {category}\n"
-        for skill, proficiency in skills.items():
-            skill_text += f"{skill}: {proficiency}\n"
-        
-        text_chunks.append({
-            "content": skill_text,
-            "type": "skills",
-            "category": category
-        })
+    if chunk_embeddings.dtype == np.int8:
+        query_embedding = query_embedding / INT8_SCALE
     
-    return text_chunks, data
+    scores = np.empty(len(chunk_embeddings), dtype=np.float32)
+    for start in range(0, len(chunk_embeddings), SCORE_BLOCK_ROWS):
+        block = chunk_embeddings[start:start + SCORE_BLOCK_ROWS]
+        np.dot(block.astype(np.float32), query_embedding, out=scores[start:start + len(block)])
+    return scores
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first, without sorting every score.
+    """
+    if k >= len(scores):
+        return np.argsort(-scores)
+    top = np.argpartition(-scores, k)[:k]
+    return top[np.argsort(-scores[top])]
+
+def rank_chunks(chunk_embeddings: np.ndarray, query_embedding: np.ndarray, top_k: int = 5) -> np.ndarray:
+    """
+    Indices of the top_k chunks most similar to a normalized query embedding.
+    """
+    # Both sides are normalized, so cosine similarity is a single matrix-vector product
+    similarities = score_chunks(chunk_embeddings, query_embedding)
+    return top_k_indices(similarities, top_k)
+
+def build_faiss_index(chunk_embeddings: np.ndarray):
+    """
+    FAISS exact inner-product index over unit-length chunk embeddings.
+    faiss is optional and only imported when this is called.
+    """
+    import faiss
+    index = faiss.IndexFlatIP(chunk_embeddings.shape[1])
+    index.add(np.ascontiguousarray(chunk_embeddings, dtype=np.float32))
+    return index
+
+def search_faiss_index(index, query_embedding: np.ndarray, top_k: int = 5) -> np.ndarray:
+    """
+    Indices of the top_k chunks in a build_faiss_index index, best first.
+    """
+    _, indices = index.search(query_embedding[None, :].astype(np.float32, copy=False), min(top_k, index.ntotal))
+    return indices[0]
 
-def find_similar_content(query: str, text_chunks: List[Dict], original_data: Dict, model) -> List[Dict]:
+def find_similar_content(query: str, text_chunks: List[Dict], original_data: Dict, model,
+                         chunk_embeddings: Optional[np.ndarray] = None,
+                         query_embedding: Optional[np.ndarray] = None, top_k: int = 5) -> List[Dict]:
     """
     Find chunks of content that are semantically similar to the query.
+    Pass chunk_embeddings from build_index to avoid re-encoding the corpus,
+    and query_embedding from encode_query if the query was already encoded.
     """
     if not text_chunks:
         return []
     
-    # Encode the query
-    query_embedding = model.encode(query)
+    if query_embedding is None:
+        query_embedding = encode_query(query, model)
     
-    # Encode all text chunks
-    chunk_embeddings = model.encode([chunk["content"] for chunk in text_chunks])
+    # Encode all text chunks unless they were precomputed
+    if chunk_embeddings is None:
+        chunk_embeddings = build_index(text_chunks, model)
     
-    # Calculate cosine similarity
-    similarities = np.dot(chunk_embeddings, query_embedding) / (
-        np.linalg.norm(chunk_embeddings, axis=1) * np.linalg.norm(query_embedding)
-    )
-    
-    # Get indices of top 3 most similar chunks
-    top_indices = np.argsort(similarities)[-5:][::-1]
+    # Get indices of the top_k most similar chunks
+    top_indices = rank_chunks(chunk_embeddings, query_embedding, top_k)
     
     # Return the top chunks
     return [text_chunks[i] for i in top_indices]
 
+def unique_by_content(indices: List[int], text_chunks: List[Dict]) -> List[int]:
+    """
+    Drop chunks whose content repeats a higher-ranked chunk, keeping rank order.
+    """
+    seen = set()
+    return [i for i in indices if not (text_chunks[i]["content"] in seen or seen.add(text_chunks[i]["content"]))]
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (about 4 characters per token), good enough for budgeting.
+    """
+    return len(text) // 4 + 1
+
+def chunk_token_counts(text_chunks: List[Dict]) -> List[int]:
+    """
+    Estimated token count of every chunk, computed once at load time.
+    """
+    return [estimate_tokens(str(chunk["content"])) for chunk in text_chunks]
+
+def fit_to_token_budget(indices: List[int], token_counts: List[int], max_tokens: int) -> Tuple[List[int], int]:
+    """
+    Keep ranked chunk indices until the token budget is used up, using the
+    precomputed token_counts. The best chunk is always kept.
+    Returns the kept indices and how many were dropped.
+    """
+    kept = []
+    used = 0
+    for i in indices:
+        if kept and used + token_counts[i] > max_tokens:
+            break
+        kept.append(i)
+        used += token_counts[i]
+    return kept, len(indices) - len(kept)
+
 if __name__ == "__main__":
-    print("sdf")
     json_file_path = "sreedata.json"
     
     
@@ -131,7 +361,6 @@ if __name__ == "__main__":
 
     
     sree_data = load_data(json_file_path)
-    print("hi")
     text_chunks, original_data = preprocess_data(sree_data)
     print(f"Loaded {len(text_chunks)} text chunks from the file.")
     
@@ -140,6 +369,9 @@ if __name__ == "__main__":
     else:
         model = SentenceTransformer('all-MiniLM-L6-v2')
         
-        similar_content = find_similar_content(user_query, text_chunks, original_data, model)
+        # Encode the corpus once; every query after that only encodes itself
+        chunk_embeddings = build_index(text_chunks, model)
+        similar_content = find_similar_content(user_query, text_chunks, original_data, model,
+                                               chunk_embeddings=chunk_embeddings)
         
         print(json.dumps(similar_content, indent=1))
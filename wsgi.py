@@ -1,10 +1,4 @@
-import os
+# Entry point for `gunicorn wsgi:app`. gunicorn.conf.py preloads this module in the
+# master, so the model and corpus embeddings are loaded once and shared by the forked
+# workers. For local development use `FLASK_DEV=1 python app.py`.
 from app import app
-
-# For Render deployment
-port = int(os.environ.get("PORT", 10000))
-print(f"Running on port: {port}")
-
-if __name__ == "__main__":
-    # Run the app with the port explicitly set
-    app.run(host="0.0.0.0", port=port)